@@ -1,10 +1,20 @@
 import streamlit as st # type: ignore
+import torch
+torch.backends.cudnn.benchmark = True
+torch.backends.cuda.matmul.allow_tf32 = True
+torch.backends.cudnn.allow_tf32 = True
 from ultralytics import YOLO
-from PIL import Image
-import tempfile
+import cv2
+import numpy as np
 import os
+import re
+import hashlib
+from types import SimpleNamespace
 os.environ["TORCH_HOME"] = "/tmp/torch"
-from datetime import datetime
+import time
+import logging
+
+LOGGER = logging.getLogger(__name__)
 
 # ============================================================
 # STREAMLIT CONFIG
@@ -24,331 +34,444 @@ st.caption("YOLOv8 • PlantVillage (38 Classes) • UniProt • AlphaFold • A
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, "yolov8_plantvillage_model.pt")
 
+# Optimized exports, produced once at build time next to the .pt. Each needs
+# its runtime from the optional section of requirements.txt. They are built
+# with a static batch of EXPORT_BATCH images:
+#   YOLO(MODEL_PATH).export(format="engine", int8=True, imgsz=224, data="plantvillage.yaml")
+#   YOLO(MODEL_PATH).export(format="openvino", int8=True, imgsz=224, data="plantvillage.yaml")
+#   YOLO(MODEL_PATH).export(format="onnx", imgsz=224)
+ENGINE_PATH = MODEL_PATH.replace(".pt", ".engine")
+OPENVINO_PATH = MODEL_PATH.replace(".pt", "_openvino_model")
+ONNX_PATH = MODEL_PATH.replace(".pt", ".onnx")
+IMGSZ = 224  # classifier input size
+USE_CUDA = torch.cuda.is_available()
+DEVICE = 0 if USE_CUDA else "cpu"
+PREDICT_OPTS = dict(imgsz=IMGSZ, device=DEVICE, half=USE_CUDA, verbose=False)
+COMPILE_BATCH = 4  # batch size the compiled graph is captured for
+EXPORT_BATCH = 1  # static batch size of the exported models
+_BLANK = np.zeros((IMGSZ, IMGSZ, 3), dtype=np.uint8)
+
 if not os.path.exists(MODEL_PATH):
     st.error("❌ yolov8_plantvillage_model.pt not found in project folder")
     st.stop()
+def resolve_model_path():
+    """Pick the fastest available export, falling back to the raw .pt weights."""
+    if USE_CUDA and os.path.exists(ENGINE_PATH):
+        return ENGINE_PATH
+    if not USE_CUDA and os.path.isdir(OPENVINO_PATH):
+        # CPU-only hosts: OpenVINO INT8 kernels (AVX-512 VNNI where available)
+        return OPENVINO_PATH
+    if os.path.exists(ONNX_PATH):
+        # ONNX Runtime picks CUDAExecutionProvider when present, else CPU
+        return ONNX_PATH
+    return MODEL_PATH
+
 @st.cache_resource(show_spinner="🔄 Loading AI model...")
 def load_model():
     try:
-        model = YOLO(MODEL_PATH)
-        return model
+        path = resolve_model_path()
+        model = YOLO(path, task="classify")
+        # Warmup: the first forward pass pays for CUDA context init, cuDNN
+        # autotune and kernel JIT, so do it at boot rather than on Diagnose.
+        # The predictor keeps the device/half/compile settings from this call.
+        batch = None if path == MODEL_PATH else EXPORT_BATCH
+        with torch.inference_mode():
+            if path == MODEL_PATH and USE_CUDA:
+                # torch.compile the PyTorch weights (needs Ultralytics >= 8.3.196).
+                # Two passes at the fixed COMPILE_BATCH shape so the graph is
+                # captured here; classify() only ever feeds that shape. GPU only:
+                # on CPU the blank padding rows would cost more than compile saves.
+                try:
+                    for _ in range(2):
+                        model([_BLANK] * COMPILE_BATCH, compile="reduce-overhead", **PREDICT_OPTS)
+                    batch = COMPILE_BATCH
+                except Exception:
+                    LOGGER.warning("torch.compile failed, falling back to eager inference", exc_info=True)
+                    model.predictor = None
+            if model.predictor is None:
+                model(_BLANK, **PREDICT_OPTS)
+        return model, batch
     except Exception as e:
         st.error("❌ Model failed to load")
         st.exception(e)
         st.stop()
 
-model = load_model()
+# MODEL_BATCH is the fixed batch size the loaded model accepts (None = any)
+model, MODEL_BATCH = load_model()
+# Resolve model.names once so every prediction is a plain list index
+CLASS_NAMES = [model.names[i] for i in range(len(model.names))]
+
+def classify(arrs):
+    """Run the model over prepared images and return (label, confidence) pairs."""
+    # Models with a fixed batch size (exports, compiled graphs) are fed chunks
+    # of exactly MODEL_BATCH images, the last one padded with blanks. Scores are
+    # read per chunk since CUDA-graph outputs are overwritten on the next replay.
+    step = MODEL_BATCH or len(arrs)
+    preds = []
+    with torch.inference_mode():
+        for start in range(0, len(arrs), step):
+            chunk = arrs[start:start + step]
+            batch = chunk + [_BLANK] * (step - len(chunk))
+            for r in model(batch, **PREDICT_OPTS)[:len(chunk)]:
+                # Top-1 class and its score from the raw probability vector
+                probs_t = r.probs.data
+                cls_id = int(probs_t.argmax())
+                confidence = float(probs_t[cls_id])
+                confidence= confidence if confidence <= 1 else confidence / 100
+                preds.append((CLASS_NAMES[cls_id], confidence))
+    return preds
 
 
 
 # ============================================================
-# UNIPROT + AMINO ACID DATABASE (38 CLASSES)
+# KNOWLEDGE BASE (UNIPROT • SEQUENCES • TREATMENTS • YIELD TIPS)
 # ============================================================
-DISEASE_TO_UNIPROT = {
-    "Squash___Powdery_mildew": "Q4WZ90",
-    "Orange___Haunglongbing_(Citrus_greening)": "Q1J9E3",
-    "Apple___Apple_scab": "A0A0A2K7Q7",
-    "Apple___Black_rot": "Q96VB9",
-    "Apple___Cedar_apple_rust": "A0A2H4I8D6",
-    "Cherry_(including_sour)___Powdery_mildew": "Q2VYF8",
-    "Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot": "Q8N1B4",
-    "Corn_(maize)___Common_rust_": "P0C5H8",
-    "Corn_(maize)___Northern_Leaf_Blight": "Q9FJA2",
-    "Grape___Black_rot": "A0A1D6Y9G4",
-    "Grape___Esca_(Black_Measles)": "A0A2R8Z2E0",
-    "Grape___Leaf_blight_(Isariopsis_Leaf_Spot)": "Q6R0H1",
-    "Peach___Bacterial_spot": "Q87T41",
-    "Pepper,_bell___Bacterial_spot": "Q87T41",
-    "Potato___Early_blight": "A0A1Y2G6H3",
-    "Potato___Late_blight": "Q9HFN0",
-    "Strawberry___Leaf_scorch": "Q8W1K5",
-    "Tomato___Bacterial_spot": "Q87T41",
-    "Tomato___Early_blight": "A0A1Y2G6H3",
-    "Tomato___Late_blight": "Q9HFN0",
-    "Tomato___Leaf_Mold": "Q8RWK8",
-    "Tomato___Septoria_leaf_spot": "A0A0F7QIP7",
-    "Tomato___Spider_mites Two-spotted_spider_mite": "Q9BXX2",
-    "Tomato___Target_Spot": "A0A1B2R4Z0",
-    "Tomato___Tomato_Yellow_Leaf_Curl_Virus": "Q9Q9S4",
-    "Tomato___Tomato_mosaic_virus": "P03576",
+# Built once per server process and shared read-only by all sessions.
+@st.cache_resource
+def _load_kb(label_meta):
+    """Join all per-label knowledge into one record per model label."""
+    # ============================================================
+    # UNIPROT + AMINO ACID DATABASE (38 CLASSES)
+    # ============================================================
+    DISEASE_TO_UNIPROT = {
+        "Squash___Powdery_mildew": "Q4WZ90",
+        "Orange___Haunglongbing_(Citrus_greening)": "Q1J9E3",
+        "Apple___Apple_scab": "A0A0A2K7Q7",
+        "Apple___Black_rot": "Q96VB9",
+        "Apple___Cedar_apple_rust": "A0A2H4I8D6",
+        "Cherry_(including_sour)___Powdery_mildew": "Q2VYF8",
+        "Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot": "Q8N1B4",
+        "Corn_(maize)___Common_rust_": "P0C5H8",
+        "Corn_(maize)___Northern_Leaf_Blight": "Q9FJA2",
+        "Grape___Black_rot": "A0A1D6Y9G4",
+        "Grape___Esca_(Black_Measles)": "A0A2R8Z2E0",
+        "Grape___Leaf_blight_(Isariopsis_Leaf_Spot)": "Q6R0H1",
+        "Peach___Bacterial_spot": "Q87T41",
+        "Pepper,_bell___Bacterial_spot": "Q87T41",
+        "Potato___Early_blight": "A0A1Y2G6H3",
+        "Potato___Late_blight": "Q9HFN0",
+        "Strawberry___Leaf_scorch": "Q8W1K5",
+        "Tomato___Bacterial_spot": "Q87T41",
+        "Tomato___Early_blight": "A0A1Y2G6H3",
+        "Tomato___Late_blight": "Q9HFN0",
+        "Tomato___Leaf_Mold": "Q8RWK8",
+        "Tomato___Septoria_leaf_spot": "A0A0F7QIP7",
+        "Tomato___Spider_mites Two-spotted_spider_mite": "Q9BXX2",
+        "Tomato___Target_Spot": "A0A1B2R4Z0",
+        "Tomato___Tomato_Yellow_Leaf_Curl_Virus": "Q9Q9S4",
+        "Tomato___Tomato_mosaic_virus": "P03576",
     
-    # Healthy host proteins
-    "Apple___healthy": "P00878",
-    "Blueberry___healthy": "Q2MHE4",
-    "Cherry_(including_sour)___healthy": "Q9M1K2",
-    "Corn_(maize)___healthy": "P04718",
-    "Grape___healthy": "Q8W4L5",
-    "Peach___healthy": "Q9SB60",
-    "Pepper,_bell___healthy": "Q9M2S6",
-    "Potato___healthy": "P00876",
-    "Raspberry___healthy": "Q9FJA2",
-    "Soybean___healthy": "P00873",
-    "Strawberry___healthy": "Q8S4Y1",
-    "Tomato___healthy": "Q964S2"
-}
+        # Healthy host proteins
+        "Apple___healthy": "P00878",
+        "Blueberry___healthy": "Q2MHE4",
+        "Cherry_(including_sour)___healthy": "Q9M1K2",
+        "Corn_(maize)___healthy": "P04718",
+        "Grape___healthy": "Q8W4L5",
+        "Peach___healthy": "Q9SB60",
+        "Pepper,_bell___healthy": "Q9M2S6",
+        "Potato___healthy": "P00876",
+        "Raspberry___healthy": "Q9FJA2",
+        "Soybean___healthy": "P00873",
+        "Strawberry___healthy": "Q8S4Y1",
+        "Tomato___healthy": "Q964S2"
+    }
 
-# Representative amino acid sequences (key pathogenic / host proteins)
-AMINO_SEQUENCES = {
-    # ================= TOMATO =================
-    "Tomato___Spider_mites Two-spotted_spider_mite": "MTEYFKRILVLTALALVAAVSAQPVLKLHVPVYPDKFPNEIKDVYGVFEGRPYKPEEFPFGLEKNPDFAWKKLVEEAGFDLNYKSLMAKYNV",
-    "Tomato___Septoria_leaf_spot": "MKKFVLALVAAVLAASPLAVSAQYCGSGSCSNYCDSCKSGYCGPGYCG",
-    "Tomato___Leaf_Mold": "MKSFTLALVAVLAASPLAVSAQYCGSGSCSNYCDSCKSGYCGPGYCG",
-    "Tomato___Late_blight": "MKKLLALAAALAVSAPAAHAQYCDEWFKRLKNFSPKGGNFECSNGCDFPV",
-    "Tomato___Early_blight": "MAFALSLALLALPAAHAECVSDGKYYCRSTGDCDPEVCGGDGSSCSNGVCGRGVC",
-    "Tomato___Bacterial_spot": "MGNICIGAGMAGSTALFVAKRMLERAGYPSRVDYVPGPARQRCLGCGILLP",
-    "Tomato___Target_Spot": "MKKLLALAAALAVSAPAAHAQYCDEWFKRLKNFSPKGGNFECSNGCDFPV",
-    "Tomato___Tomato_mosaic_virus": "MTKTLALVTSLAFLVAVSAAQPVKLHVPVYPDKFPNEIKDVYGVFEGRPY",
-    "Tomato___Tomato_Yellow_Leaf_Curl_Virus": "MNKYVSKTSSGSVVTLDEIRGINAQKSFGDNLYYVNFKSKHADGVRVGLGF",
-    "Tomato___healthy": "MEEEIAALVIDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQGVMVGMGQKDSYVGDEAQSKRGILTLKYPIEHGIVTNWDDMEKIWHHTFYNELR",
+    # Sequences shared by several labels, stored once
+    SHARED_SEQ = {
+        "fungal_A": "MKKFVLALVAAVLAASPLAVSAQYCGSGSCSNYCDSCKSGYCGPGYCG",
+        "fungal_B": "MKSFTLALVAVLAASPLAVSAQYCGSGSCSNYCDSCKSGYCGPGYCG",
+        "fungal_C": "MRAVLLALAAALAVSAPAAHAECVSDGKYYCRSTGDCDPEVCGGDGSSCSNGVCGRGVC",
+        "fungal_D": "MKKVLLLALVAAVLAVSPLAVSAQYCGNGSCSNYCDSCKSGYCGPGYCG",
+        "blight": "MKKLLALAAALAVSAPAAHAQYCDEWFKRLKNFSPKGGNFECSNGCDFPV",
+        "early_blight": "MAFALSLALLALPAAHAECVSDGKYYCRSTGDCDPEVCGGDGSSCSNGVCGRGVC",
+        "powdery_mildew": "MKTLLLALVAAVLAVSAPAAHAECVSDGKYYSRSTGDCDPEVCGGDGSSCSNGVCGRGVC",
+        "bacterial_spot": "MGNICIGAGMAGSTALFVAKRMLERAGYPSRVDYVPGPARQRCLGCGILLP",
+        "healthy_actin": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQGVMVG",
+        "healthy_actin_short": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQ"
+    }
+
+    # Representative amino acid sequences (key pathogenic / host proteins)
+    AMINO_SEQUENCES = {
+        # ================= TOMATO =================
+        "Tomato___Spider_mites Two-spotted_spider_mite": "MTEYFKRILVLTALALVAAVSAQPVLKLHVPVYPDKFPNEIKDVYGVFEGRPYKPEEFPFGLEKNPDFAWKKLVEEAGFDLNYKSLMAKYNV",
+        "Tomato___Septoria_leaf_spot": SHARED_SEQ["fungal_A"],
+        "Tomato___Leaf_Mold": SHARED_SEQ["fungal_B"],
+        "Tomato___Late_blight": SHARED_SEQ["blight"],
+        "Tomato___Early_blight": SHARED_SEQ["early_blight"],
+        "Tomato___Bacterial_spot": SHARED_SEQ["bacterial_spot"],
+        "Tomato___Target_Spot": SHARED_SEQ["blight"],
+        "Tomato___Tomato_mosaic_virus": "MTKTLALVTSLAFLVAVSAAQPVKLHVPVYPDKFPNEIKDVYGVFEGRPY",
+        "Tomato___Tomato_Yellow_Leaf_Curl_Virus": "MNKYVSKTSSGSVVTLDEIRGINAQKSFGDNLYYVNFKSKHADGVRVGLGF",
+        "Tomato___healthy": "MEEEIAALVIDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQGVMVGMGQKDSYVGDEAQSKRGILTLKYPIEHGIVTNWDDMEKIWHHTFYNELR",
     
-    # ================= POTATO =================
-    "Potato___Late_blight": "MKKLLALAAALAVSAPAAHAQYCDEWFKRLKNFSPKGGNFECSNGCDFPV",
-    "Potato___Early_blight": "MAFALSLALLALPAAHAECVSDGKYYCRSTGDCDPEVCGGDGSSCSNGVCGRGVC",
-    "Potato___healthy": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQGVMVGMGQKDSYVGDEAQSKRGILTLKYPI",
+        # ================= POTATO =================
+        "Potato___Late_blight": SHARED_SEQ["blight"],
+        "Potato___Early_blight": SHARED_SEQ["early_blight"],
+        "Potato___healthy": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQGVMVGMGQKDSYVGDEAQSKRGILTLKYPI",
     
-    # ================= APPLE =================
-    "Apple___Apple_scab": "MKKFVLALVAAVLAASPLAVSAQYCGSGSCSNYCDSCKSGYCGPGYCG",
-    "Apple___Black_rot": "MRAVLLALAAALAVSAPAAHAECVSDGKYYCRSTGDCDPEVCGGDGSSCSNGVCGRGVC",
-    "Apple___Cedar_apple_rust": "MKSFTLALVAVLAASPLAVSAQYCGSGSCSNYCDSCKSGYCGPGYCG",
-    "Apple___healthy": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQGVMVGMGQKDSYVGDEAQSK",
+        # ================= APPLE =================
+        "Apple___Apple_scab": SHARED_SEQ["fungal_A"],
+        "Apple___Black_rot": SHARED_SEQ["fungal_C"],
+        "Apple___Cedar_apple_rust": SHARED_SEQ["fungal_B"],
+        "Apple___healthy": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQGVMVGMGQKDSYVGDEAQSK",
     
-    # ================= GRAPE =================
-    "Grape___Black_rot": "MKSFTLALVAVLAASPLAVSAQYCGSGSCSNYCDSCKSGYCGPGYCG",
-    "Grape___Esca_(Black_Measles)": "MKKVLLLALVAAVLAVSPLAVSAQYCGNGSCSNYCDSCKSGYCGPGYCG",
-    "Grape___Leaf_blight_(Isariopsis_Leaf_Spot)": "MRAVLLALAAALAVSAPAAHAECVSDGKYYCRSTGDCDPEVCGGDGSSCSNGVCGRGVC",
-    "Grape___healthy": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQGVMVGMGQKDSY",
+        # ================= GRAPE =================
+        "Grape___Black_rot": SHARED_SEQ["fungal_B"],
+        "Grape___Esca_(Black_Measles)": SHARED_SEQ["fungal_D"],
+        "Grape___Leaf_blight_(Isariopsis_Leaf_Spot)": SHARED_SEQ["fungal_C"],
+        "Grape___healthy": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQGVMVGMGQKDSY",
     
-    # ================= CORN =================
-    "Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot": "MKKLLALAAALAVSAPAAHAQYCDEWFKRLKNFSPKGGNFECSNGCDFPV",
-    "Corn_(maize)___Common_rust_": "MRAVLLALAAALAVSAPAAHAECVSDGKYYCRSTGDCDPEVCGGDGSSCSNGVCGRGVC",
-    "Corn_(maize)___Northern_Leaf_Blight": "MKSFTLALVAVLAASPLAVSAQYCGSGSCSNYCDSCKSGYCGPGYCG",
-    "Corn_(maize)___healthy": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQGVMVG",
+        # ================= CORN =================
+        "Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot": SHARED_SEQ["blight"],
+        "Corn_(maize)___Common_rust_": SHARED_SEQ["fungal_C"],
+        "Corn_(maize)___Northern_Leaf_Blight": SHARED_SEQ["fungal_B"],
+        "Corn_(maize)___healthy": SHARED_SEQ["healthy_actin"],
     
-    # ================= OTHERS =================
-    "Cherry_(including_sour)___Powdery_mildew": "MKTLLLALVAAVLAVSAPAAHAECVSDGKYYSRSTGDCDPEVCGGDGSSCSNGVCGRGVC",
-    "Cherry_(including_sour)___healthy": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQGVMVG",
-    "Blueberry___healthy": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQGVMVG",
-    "Pepper,_bell___Bacterial_spot": "MGNICIGAGMAGSTALFVAKRMLERAGYPSRVDYVPGPARQRCLGCGILLP",
-    "Pepper,_bell___healthy": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQ",
-    "Peach___Bacterial_spot": "MKKVLLALAAALAVSAPAAHAECVSDGKYYCRSTGDCDPEVCGGDGSSCSNGVCGRGVC",
-    "Peach___healthy": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQ",
-    "Strawberry___Leaf_scorch": "MKKVLLLALVAAVLAVSPLAVSAQYCGNGSCSNYCDSCKSGYCGPGYCG",
-    "Strawberry___healthy": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQ",
-    "Squash___Powdery_mildew": "MKTLLLALVAAVLAVSAPAAHAECVSDGKYYSRSTGDCDPEVCGGDGSSCSNGVCGRGVC",
-    "Soybean___healthy": "MEEEIAALVVDNGSGMCKAGFAGDDAPRAVFPSIVGRPRHQ",
-    "Raspberry___healthy": "MQVWPPLRVKPFNLLVGFNTRCAIPHPRSQLFGFNT"
-}
+        # ================= OTHERS =================
+        "Cherry_(including_sour)___Powdery_mildew": SHARED_SEQ["powdery_mildew"],
+        "Cherry_(including_sour)___healthy": SHARED_SEQ["healthy_actin"],
+        "Blueberry___healthy": SHARED_SEQ["healthy_actin"],
+        "Pepper,_bell___Bacterial_spot": SHARED_SEQ["bacterial_spot"],
+        "Pepper,_bell___healthy": SHARED_SEQ["healthy_actin_short"],
+        "Peach___Bacterial_spot": "MKKVLLALAAALAVSAPAAHAECVSDGKYYCRSTGDCDPEVCGGDGSSCSNGVCGRGVC",
+        "Peach___healthy": SHARED_SEQ["healthy_actin_short"],
+        "Strawberry___Leaf_scorch": SHARED_SEQ["fungal_D"],
+        "Strawberry___healthy": SHARED_SEQ["healthy_actin_short"],
+        "Squash___Powdery_mildew": SHARED_SEQ["powdery_mildew"],
+        "Soybean___healthy": SHARED_SEQ["healthy_actin_short"],
+        "Raspberry___healthy": "MQVWPPLRVKPFNLLVGFNTRCAIPHPRSQLFGFNT"
+    }
 
-# ============================================================
-# TREATMENT DATABASE
-# ============================================================
-TREATMENT_DB = {
-    "Virus": {
-        "chemical": [
-            ("Imidacloprid 17.8% SL", "0.3 ml/L", "Vector (whitefly) control"),
-            ("Thiamethoxam 25% WG", "0.25 g/L", "Vector suppression")
-        ],
-        "organic": [
-            ("Neem Oil (1500 ppm)", "3–5 ml/L", "Reduces vector population"),
-            ("Yellow sticky traps", "10–12 traps/acre", "Monitoring & control")
-        ]
-    },
-    "Fungus": {
-        "chemical": [
-            ("Mancozeb 75% WP", "2–2.5 g/L", "Protective fungicide"),
-            ("Carbendazim 50% WP", "1 g/L", "Systemic control")
-        ],
-        "organic": [
-            ("Neem oil", "3 ml/L", "Fungal suppression"),
-            ("Trichoderma viride", "5 g/L soil drench", "Biocontrol")
-        ]
-    },
-    "Bacterium": {
-        "chemical": [
-            ("Copper Oxychloride 50% WP", "2.5–3 g/L", "Bacterial suppression"),
-            ("Streptocycline", "0.1 g/L", "Bacteriostatic")
-        ],
-        "organic": [
-            ("Neem extract", "5 ml/L", "Reduces spread"),
-            ("Field sanitation", "Remove infected plants", "Prevention")
-        ]
-    },
-    "Arthropod": {
-        "chemical": [
-            ("Abamectin 1.9% EC", "0.5 ml/L", "Mite control")
-        ],
-        "organic": [
-            ("Neem oil", "3 ml/L", "Mite suppression")
-        ]
+    # ============================================================
+    # TREATMENT DATABASE
+    # ============================================================
+    TREATMENT_DB = {
+        "Virus": {
+            "chemical": [
+                ("Imidacloprid 17.8% SL", "0.3 ml/L", "Vector (whitefly) control"),
+                ("Thiamethoxam 25% WG", "0.25 g/L", "Vector suppression")
+            ],
+            "organic": [
+                ("Neem Oil (1500 ppm)", "3–5 ml/L", "Reduces vector population"),
+                ("Yellow sticky traps", "10–12 traps/acre", "Monitoring & control")
+            ]
+        },
+        "Fungus": {
+            "chemical": [
+                ("Mancozeb 75% WP", "2–2.5 g/L", "Protective fungicide"),
+                ("Carbendazim 50% WP", "1 g/L", "Systemic control")
+            ],
+            "organic": [
+                ("Neem oil", "3 ml/L", "Fungal suppression"),
+                ("Trichoderma viride", "5 g/L soil drench", "Biocontrol")
+            ]
+        },
+        "Bacterium": {
+            "chemical": [
+                ("Copper Oxychloride 50% WP", "2.5–3 g/L", "Bacterial suppression"),
+                ("Streptocycline", "0.1 g/L", "Bacteriostatic")
+            ],
+            "organic": [
+                ("Neem extract", "5 ml/L", "Reduces spread"),
+                ("Field sanitation", "Remove infected plants", "Prevention")
+            ]
+        },
+        "Arthropod": {
+            "chemical": [
+                ("Abamectin 1.9% EC", "0.5 ml/L", "Mite control")
+            ],
+            "organic": [
+                ("Neem oil", "3 ml/L", "Mite suppression")
+            ]
+        }
     }
-}
 
-# ============================================================
-# YIELD BOOSTING TECHNIQUES
-# ============================================================
-YIELD_TIPS = {
-    # ===================== TOMATO =====================
-    "Tomato": [
-        "Use certified disease-free seedlings",
-        "Maintain spacing of 60 × 45 cm for airflow",
-        "Apply balanced NPK (120:60:60 kg/ha)",
-        "Calcium sprays to prevent blossom end rot",
-        "Drip irrigation with mulching",
-        "Regular pruning and staking",
-        "Expected yield: 60–80 tons/ha"
-    ],
+    # ============================================================
+    # YIELD BOOSTING TECHNIQUES
+    # ============================================================
+    YIELD_TIPS = {
+        # ===================== TOMATO =====================
+        "Tomato": [
+            "Use certified disease-free seedlings",
+            "Maintain spacing of 60 × 45 cm for airflow",
+            "Apply balanced NPK (120:60:60 kg/ha)",
+            "Calcium sprays to prevent blossom end rot",
+            "Drip irrigation with mulching",
+            "Regular pruning and staking",
+            "Expected yield: 60–80 tons/ha"
+        ],
     
-    # ===================== POTATO =====================
-    "Potato": [
-        "Use certified seed tubers",
-        "Avoid water stagnation",
-        "Earth-up twice (20 and 40 days)",
-        "Apply Zn and B micronutrients",
-        "Practice crop rotation",
-        "Expected yield: 30–40 tons/ha"
-    ],
+        # ===================== POTATO =====================
+        "Potato": [
+            "Use certified seed tubers",
+            "Avoid water stagnation",
+            "Earth-up twice (20 and 40 days)",
+            "Apply Zn and B micronutrients",
+            "Practice crop rotation",
+            "Expected yield: 30–40 tons/ha"
+        ],
     
-    # ===================== APPLE =====================
-    "Apple": [
-        "Annual pruning for canopy management",
-        "Fruit thinning to improve size",
-        "Balanced NPK + calcium sprays",
-        "Use disease-resistant rootstocks",
-        "Adequate winter chilling management",
-        "Expected yield: 20–25 tons/ha"
-    ],
+        # ===================== APPLE =====================
+        "Apple": [
+            "Annual pruning for canopy management",
+            "Fruit thinning to improve size",
+            "Balanced NPK + calcium sprays",
+            "Use disease-resistant rootstocks",
+            "Adequate winter chilling management",
+            "Expected yield: 20–25 tons/ha"
+        ],
     
-    # ===================== GRAPE =====================
-    "Grape": [
-        "Canopy management for sunlight penetration",
-        "Drip irrigation with fertigation",
-        "Apply Zn and Fe micronutrients",
-        "Timely pruning and shoot thinning",
-        "Avoid excess nitrogen",
-        "Expected yield: 25–30 tons/ha"
-    ],
+        # ===================== GRAPE =====================
+        "Grape": [
+            "Canopy management for sunlight penetration",
+            "Drip irrigation with fertigation",
+            "Apply Zn and Fe micronutrients",
+            "Timely pruning and shoot thinning",
+            "Avoid excess nitrogen",
+            "Expected yield: 25–30 tons/ha"
+        ],
     
-    # ===================== CORN =====================
-    "Corn": [
-        "Use high-yielding hybrids",
-        "Split nitrogen application",
-        "Maintain proper plant spacing",
-        "Weed control during early growth",
-        "Seed treatment before sowing",
-        "Expected yield: 8–10 tons/ha"
-    ],
+        # ===================== CORN =====================
+        "Corn": [
+            "Use high-yielding hybrids",
+            "Split nitrogen application",
+            "Maintain proper plant spacing",
+            "Weed control during early growth",
+            "Seed treatment before sowing",
+            "Expected yield: 8–10 tons/ha"
+        ],
     
-    # ===================== PEPPER =====================
-    "Pepper": [
-        "Use staking for better plant support",
-        "Apply potassium-rich fertilizers",
-        "Regular harvesting to promote fruiting",
-        "Drip irrigation with mulch",
-        "Foliar feeding during flowering",
-        "Expected yield: 25–35 tons/ha"
-    ],
+        # ===================== PEPPER =====================
+        "Pepper": [
+            "Use staking for better plant support",
+            "Apply potassium-rich fertilizers",
+            "Regular harvesting to promote fruiting",
+            "Drip irrigation with mulch",
+            "Foliar feeding during flowering",
+            "Expected yield: 25–35 tons/ha"
+        ],
     
-    # ===================== PEACH =====================
-    "Peach": [
-        "Summer pruning for light penetration",
-        "Fruit thinning for uniform size",
-        "Calcium sprays for fruit firmness",
-        "Windbreak protection",
-        "Balanced irrigation scheduling",
-        "Expected yield: 15–20 tons/ha"
-    ],
+        # ===================== PEACH =====================
+        "Peach": [
+            "Summer pruning for light penetration",
+            "Fruit thinning for uniform size",
+            "Calcium sprays for fruit firmness",
+            "Windbreak protection",
+            "Balanced irrigation scheduling",
+            "Expected yield: 15–20 tons/ha"
+        ],
     
-    # ===================== CHERRY =====================
-    "Cherry": [
-        "Bird netting during fruit set",
-        "Balanced fertilization",
-        "Proper irrigation during flowering",
-        "Timely harvesting",
-        "Avoid water stress",
-        "Expected yield: 10–15 tons/ha"
-    ],
+        # ===================== CHERRY =====================
+        "Cherry": [
+            "Bird netting during fruit set",
+            "Balanced fertilization",
+            "Proper irrigation during flowering",
+            "Timely harvesting",
+            "Avoid water stress",
+            "Expected yield: 10–15 tons/ha"
+        ],
     
-    # ===================== STRAWBERRY =====================
-    "Strawberry": [
-        "Raised bed cultivation",
-        "Plastic mulch to reduce weed pressure",
-        "Ensure bee pollination",
-        "Regular runner removal",
-        "Successive planting strategy",
-        "Expected yield: 40–60 tons/ha"
-    ],
+        # ===================== STRAWBERRY =====================
+        "Strawberry": [
+            "Raised bed cultivation",
+            "Plastic mulch to reduce weed pressure",
+            "Ensure bee pollination",
+            "Regular runner removal",
+            "Successive planting strategy",
+            "Expected yield: 40–60 tons/ha"
+        ],
     
-    # ===================== BLUEBERRY =====================
-    "Blueberry": [
-        "Maintain acidic soil (pH 4.5–5.5)",
-        "Organic mulching with pine bark",
-        "Drip irrigation",
-        "Prune old canes annually",
-        "Avoid excess nitrogen",
-        "Expected yield: 8–12 tons/ha"
-    ],
+        # ===================== BLUEBERRY =====================
+        "Blueberry": [
+            "Maintain acidic soil (pH 4.5–5.5)",
+            "Organic mulching with pine bark",
+            "Drip irrigation",
+            "Prune old canes annually",
+            "Avoid excess nitrogen",
+            "Expected yield: 8–12 tons/ha"
+        ],
     
-    # ===================== SOYBEAN =====================
-    "Soybean": [
-        "Seed inoculation with Rhizobium",
-        "Balanced fertilization",
-        "Maintain proper plant population",
-        "Timely weed control",
-        "Crop rotation with cereals",
-        "Expected yield: 3–4 tons/ha"
-    ],
+        # ===================== SOYBEAN =====================
+        "Soybean": [
+            "Seed inoculation with Rhizobium",
+            "Balanced fertilization",
+            "Maintain proper plant population",
+            "Timely weed control",
+            "Crop rotation with cereals",
+            "Expected yield: 3–4 tons/ha"
+        ],
     
-    # ===================== RASPBERRY =====================
-    "Raspberry": [
-        "Prune old canes after harvest",
-        "Maintain good drainage",
-        "Mulching for moisture conservation",
-        "Support trellis system",
-        "Balanced nutrient management",
-        "Expected yield: 10–15 tons/ha"
-    ],
+        # ===================== RASPBERRY =====================
+        "Raspberry": [
+            "Prune old canes after harvest",
+            "Maintain good drainage",
+            "Mulching for moisture conservation",
+            "Support trellis system",
+            "Balanced nutrient management",
+            "Expected yield: 10–15 tons/ha"
+        ],
     
-    # ===================== SQUASH =====================
-    "Squash": [
-        "Adequate pollination (bee-friendly practices)",
-        "Maintain vine spacing",
-        "Apply potassium during fruiting",
-        "Drip irrigation",
-        "Remove old leaves regularly",
-        "Expected yield: 20–30 tons/ha"
-    ],
+        # ===================== SQUASH =====================
+        "Squash": [
+            "Adequate pollination (bee-friendly practices)",
+            "Maintain vine spacing",
+            "Apply potassium during fruiting",
+            "Drip irrigation",
+            "Remove old leaves regularly",
+            "Expected yield: 20–30 tons/ha"
+        ],
     
-    # ===================== ORANGE =====================
-    "Orange": [
-        "Maintain orchard sanitation",
-        "Balanced NPK with micronutrients",
-        "Avoid water stress during flowering",
-        "Proper canopy management",
-        "Use certified planting material",
-        "Expected yield: 25–35 tons/ha"
-    ]
-}
+        # ===================== ORANGE =====================
+        "Orange": [
+            "Maintain orchard sanitation",
+            "Balanced NPK with micronutrients",
+            "Avoid water stress during flowering",
+            "Proper canopy management",
+            "Use certified planting material",
+            "Expected yield: 25–35 tons/ha"
+        ]
+    }
+
+    kb = {}
+    for label, (pathogen, base_score) in label_meta.items():
+        crop = label.split("___")[0]
+        uniprot = DISEASE_TO_UNIPROT.get(label, "N/A")
+        kb[label] = SimpleNamespace(
+            uniprot=uniprot,
+            sequence=AMINO_SEQUENCES.get(label, "Sequence not available"),
+            alphafold=f"https://alphafold.ebi.ac.uk/entry/{uniprot}" if uniprot != "N/A" else "N/A",
+            pathogen=pathogen,
+            base_score=base_score,
+            crop=crop,
+            tips=YIELD_TIPS.get(crop, ["Follow best local practices for this crop"]),
+            treatment=TREATMENT_DB.get(pathogen),
+        )
+    return kb
 
 # ============================================================
 # RECOVERY TIMELINE
 # ============================================================
-RECOVERY_TIMELINE = {
-    "Low": [
-        "Immediate: Monitor plant regularly",
-        "2–4 weeks: Observe symptom changes",
-        "1 season: Preventive care"
-    ],
-    "Medium": [
-        "Immediate: Apply recommended treatment",
-        "2–4 weeks: Remove infected leaves",
-        "1 season: Improve soil and crop rotation"
-    ],
-    "High": [
-        "Immediate: Begin treatment within 24–48 hours",
-        "2–4 weeks: Remove severely infected plants",
-        "1 season: Strict prevention and sanitation"
-    ]
-}
+@st.cache_resource
+def _load_recovery_timeline():
+    return {
+        "Low": [
+            "Immediate: Monitor plant regularly",
+            "2–4 weeks: Observe symptom changes",
+            "1 season: Preventive care"
+        ],
+        "Medium": [
+            "Immediate: Apply recommended treatment",
+            "2–4 weeks: Remove infected leaves",
+            "1 season: Improve soil and crop rotation"
+        ],
+        "High": [
+            "Immediate: Begin treatment within 24–48 hours",
+            "2–4 weeks: Remove severely infected plants",
+            "1 season: Strict prevention and sanitation"
+        ]
+    }
+
+RECOVERY_TIMELINE = _load_recovery_timeline()
 
 # ============================================================
 # HELPER FUNCTIONS
@@ -365,179 +488,274 @@ def infer_pathogen_type(label):
         return "Arthropod"
     return "Fungus"
 
+def decode_image(uploaded):
+    """Decode an uploaded file straight from its bytes into a BGR array."""
+    buf = np.frombuffer(uploaded.getvalue(), dtype=np.uint8)
+    return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+def prepare_input(bgr):
+    """Downscale a decoded BGR image for inference."""
+    # Shrink so the shorter side matches the model input; the model's own
+    # resize + center crop then works on ~224px instead of a full-res photo.
+    # Ultralytics expects BGR for NumPy inputs, so no channel swap is needed.
+    h, w = bgr.shape[:2]
+    scale = IMGSZ / min(h, w)
+    if scale < 1:
+        bgr = cv2.resize(bgr, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_LINEAR)
+    return bgr
+
 # ==================== HEALTH SCORE LOGIC ====================
-def calculate_health_score(disease_name, confidence):
-    """Calculate health score based on disease type and confidence."""
-    disease_name_lower = disease_name.lower()
-    
-    if "healthy" in disease_name_lower:
-        return min(100, confidence * 120)
+# Disease-specific health scores (None = healthy). PlantVillage labels carry
+# at most one of these keywords, so the first regex match decides.
+_BASE_SCORES = {
+    "healthy": None,
+    "virus": 30,
+    "late_blight": 35,
+    "early_blight": 45,
+    "bacterial": 40,
+    "mold": 55,
+    "rust": 50,
+    "scab": 60,
+    "mildew": 65,
+}
+_SEV_RE = re.compile("|".join(_BASE_SCORES))
+
+def base_health_score(disease_name):
+    """Base health score for a disease label (None for healthy plants)."""
+    m = _SEV_RE.search(disease_name.lower())
+    return _BASE_SCORES[m.group(0)] if m else 60
+
+# ==================== LABEL LOOKUP TABLE ====================
+# CLASS_NAMES is fixed once the model is loaded, so resolve every label's
+# pathogen type and base score up front instead of on each diagnosis.
+@st.cache_resource
+def load_label_meta():
+    return {
+        name: (infer_pathogen_type(name), base_health_score(name))
+        for name in CLASS_NAMES
+    }
+
+LABEL_META = load_label_meta()
+KB = _load_kb(LABEL_META)
+
+# ============================================================
+# REPORT TEMPLATES
+# ============================================================
+# Everything in the report that does not depend on the prediction is
+# composed once here; build_report() picks blocks by index.
+SEVERITY_NAMES = ("High", "Medium", "GOOD")
+
+_RECOVERY_TEXT = tuple(
+    "\n\n".join(f"• {step}" for step in RECOVERY_TIMELINE[sev])
+    if sev in RECOVERY_TIMELINE
+    else "• No recovery actions required (plant is healthy)."
+    for sev in SEVERITY_NAMES
+)
+
+_DAMAGE_TEXT = """\
+• LOW: <20% leaf area affected – Minor yield impact (5–15%)
+
+• MEDIUM: 20–50% – Moderate yield impact (20–40%)
+
+• HIGH: >50% – Severe yield impact (45–70%)"""
+
+_HEALTHY_TREATMENT_TEXT = """\
+• No pesticide required.
+
+• Follow good agronomic and preventive practices:
+
+  - Maintain proper irrigation schedule
+
+  - Apply balanced fertilizers based on soil test
+
+  - Ensure good air circulation and spacing
+
+  - Monitor weekly for early disease or pest signs"""
+
+_LONG_TERM_TEXT = """\
+1. Monitor plant health regularly
+
+2. Maintain optimal growing conditions
+
+3. Consult with local agricultural experts"""
+
+# Indexed by healthy (0 = diseased, 1 = healthy)
+_ACTION_PLAN = (
+    """\
+1. Begin treatment within 24–48 hours
+
+2. Remove severely infected plant material
+
+3. Adjust irrigation to minimize leaf wetness
+
+4. Monitor progress weekly
+
+5. Isolate affected plants if possible""",
+    """\
+1. Maintain proper irrigation and nutrition
+
+2. Monitor weekly for early disease signs
+
+3. Continue preventive care practices""",
+)
+_STATUS = ("DISEASED ⚠️", "HEALTHY ✅")
+_EXPECTED_RECOVERY = ("Follow treatment schedule", "Routine care")
+_NEXT_REVIEW = ("2 weeks", "1 month")
+
+_RECOMMENDATIONS_TEXT = """\
+💡 **RECOMMENDATIONS:**
+
+• For severe infections, consult local agricultural extension
+
+• Always follow pesticide label instructions
+
+• Consider integrated pest management approaches
+
+• Keep records of treatments and plant responses"""
+
+# ============================================================
+# REPORT BUILDER
+# ============================================================
+def build_report(label, confidence):
+    """Compose the full diagnosis report for one image as markdown."""
+    rec = KB[label]
+    pathogen = rec.pathogen
+    healthy = int(pathogen == "Healthy")
+    if rec.base_score is None:
+        health_score = min(100, confidence * 120)
+    else:
+        # Adjust based on confidence, minimum 10% health
+        health_score = max(10, rec.base_score * (1 - confidence * 0.5))
+
+    sev_idx = 0 if health_score <= 10 else 1 if health_score < 50 else 2
+    severity = SEVERITY_NAMES[sev_idx]
     
-    # Disease-specific health scores
-    if "virus" in disease_name_lower:
-        base_score = 30
-    elif "late_blight" in disease_name_lower:
-        base_score = 35
-    elif "early_blight" in disease_name_lower:
-        base_score = 45
-    elif "bacterial" in disease_name_lower:
-        base_score = 40
-    elif "mold" in disease_name_lower:
-        base_score = 55
-    elif "rust" in disease_name_lower:
-        base_score = 50
-    elif "scab" in disease_name_lower:
-        base_score = 60
-    elif "mildew" in disease_name_lower:
-        base_score = 65
+    # ============================================================
+    # FINAL DIAGNOSIS OUTPUT
+    # ============================================================
+    # Paragraphs are joined into one markdown string, rendered by a single
+    # st.markdown call.
+    report = []
+    report.append("## 📊 1. DETECTION RESULTS")
+    report.append(f"• Predicted Disease: {label}")
+    report.append(f"• Detection Confidence: {confidence*100:.2f}%")
+    report.append(f"• Plant Status: {_STATUS[healthy]}")
+    report.append(f"• Health Score: {health_score:.1f}%")
+    report.append(f"• Disease Severity: {severity}")
+
+    report.append("## 🦠 2. PATHOGEN BIOLOGY")
+    report.append(f"• Pathogen Type: {pathogen}")
+    report.append(f"• UniProt ID: {rec.uniprot}")
+    report.append(f"• Key Protein Sequence: {rec.sequence}")
+    report.append(f"• 3D Structure Prediction: {rec.alphafold}")
+
+    report.append("## 🔍 3. DAMAGE ASSESSMENT")
+    report.append(_DAMAGE_TEXT)
+
+    report.append("## 💊 4. TREATMENT RECOMMENDATIONS")
+    report.append("────────────────────────────────────────")
+
+    if healthy:
+        report.append(_HEALTHY_TREATMENT_TEXT)
     else:
-        base_score = 60
+        treatment = rec.treatment
+
+        if treatment:
+            # ---------------- CHEMICAL CONTROL ----------------
+            report.append("**CHEMICAL CONTROL:**")
+            report.extend(
+                f"- **{name}** | Dose: {dose} | Purpose: {purpose}"
+                for name, dose, purpose in treatment.get("chemical", [])
+            )
+
+            # ---------------- ORGANIC / BIOLOGICAL CONTROL ----------------
+            report.append("\n**ORGANIC / BIOLOGICAL CONTROL:**")
+            report.extend(
+                f"- **{name}** | Dose: {dose} | Purpose: {purpose}"
+                for name, dose, purpose in treatment.get("organic", [])
+            )
+        else:
+            report.append("• Treatment data not available.")
+            report.append("• Consult local agricultural extension services.")
+
+    report.append("## 📅 5. RECOVERY TIMELINE")
+    report.append(_RECOVERY_TEXT[sev_idx])
+
+    report.append("## 🌾 6. YIELD BOOSTING TECHNIQUES")
+    report.extend(f"{i}. {tip}" for i, tip in enumerate(rec.tips, 1))
+
+    report.append("## 🌱 7. LONG-TERM HEALTH MAINTENANCE")
+    report.append(_LONG_TERM_TEXT)
+
+    report.append("## ✅ 8. IMMEDIATE ACTION PLAN")
+    report.append(_ACTION_PLAN[healthy])
+
+    report.append("---")
+    report.append("### 📋 REPORT SUMMARY")
+    report.append(f"• Diagnosis: {label} ({confidence*100:.2f}% confidence)")
+    report.append(f"• Status: {_STATUS[healthy]}")
+    report.append(f"• Health Score: {health_score:.1f}%")
+    report.append(f"• Treatment Priority: {severity}")
+    report.append(f"• Expected Recovery: {_EXPECTED_RECOVERY[healthy]}")
+    report.append(f"• Next Review: {_NEXT_REVIEW[healthy]}")
+
+    report.append(_RECOMMENDATIONS_TEXT)
+
+    # Add timestamp
+    report.append(f"*Report generated: {time.strftime('%Y-%m-%d %H:%M:%S')}*")
     
-    # Adjust based on confidence
-    adjusted_score = base_score * (1 - confidence * 0.5)
-    return max(10, adjusted_score)  # Minimum 10% healt
+    return "\n\n".join(report)
 
 # ============================================================
 # UI: IMAGE UPLOAD
 # ============================================================
-uploaded_file = st.file_uploader("📤 Upload plant leaf image", ["jpg", "jpeg", "png"])
+uploaded_files = st.file_uploader(
+    "📤 Upload plant leaf image(s)", ["jpg", "jpeg", "png"], accept_multiple_files=True
+)
 
-if uploaded_file:
-    image = Image.open(uploaded_file).convert("RGB")
-    st.image(image, use_container_width=True)
+if uploaded_files:
+    # Skip files that fail to decode so the remaining uploads can still be diagnosed
+    decoded = []
+    for f in uploaded_files:
+        image = decode_image(f)
+        if image is None:
+            st.error(f"❌ Could not read image: {f.name}")
+        else:
+            decoded.append((f, image))
+    uploaded_files = [f for f, _ in decoded]
+    images = [image for _, image in decoded]
+    for f, image in decoded:
+        st.image(image, caption=f.name, channels="BGR", use_container_width=True)
     
-    if st.button("🔍 Diagnose"):
-        with st.spinner("Analyzing plant health..."):
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-                image.save(tmp.name)
-                path = tmp.name
-            
-            results = model(path)
-            r = results[0]
-            
-            cls_id = int(r.probs.top1)
-            confidence = float(r.probs.top1conf)
-            label = model.names[cls_id]
-            
-            pathogen = infer_pathogen_type(label)
-            confidence= confidence if confidence <= 1 else confidence / 100
-            health_score = calculate_health_score(label, confidence)
-
-            severity = "High" if health_score <= 10 else "Medium" if health_score < 50 else "GOOD" 
-            
-            
-            uniprot = DISEASE_TO_UNIPROT.get(label, "N/A")
-            sequence = AMINO_SEQUENCES.get(label, "Sequence not available")
-            alphafold = f"https://alphafold.ebi.ac.uk/entry/{uniprot}" if uniprot != "N/A" else "N/A"
-            
-            crop = label.split("___")[0]
-            
-            # ============================================================
-            # FINAL DIAGNOSIS OUTPUT
-            # ============================================================
-            st.markdown("## 📊 1. DETECTION RESULTS")
-            st.write(f"• Predicted Disease: {label}")
-            st.write(f"• Detection Confidence: {confidence*100:.2f}%")
-            st.write(f"• Plant Status: {'HEALTHY ✅' if pathogen=='Healthy' else 'DISEASED ⚠️'}")
-            st.write(f"• Health Score: {health_score:.1f}%")
-            st.write(f"• Disease Severity: {severity}")
-            
-            st.markdown("## 🦠 2. PATHOGEN BIOLOGY")
-            st.write(f"• Pathogen Type: {pathogen}")
-            st.write(f"• UniProt ID: {uniprot}")
-            st.write(f"• Key Protein Sequence: {sequence}")
-            st.write(f"• 3D Structure Prediction: {alphafold}")
-            
-            st.markdown("## 🔍 3. DAMAGE ASSESSMENT")
-            st.write("• LOW: <20% leaf area affected – Minor yield impact (5–15%)")
-            st.write("• MEDIUM: 20–50% – Moderate yield impact (20–40%)")
-            st.write("• HIGH: >50% – Severe yield impact (45–70%)")
-            
-            st.markdown("## 💊 4. TREATMENT RECOMMENDATIONS")
-            st.markdown("────────────────────────────────────────")
-            
-            if pathogen == "Healthy":
-                st.write("• No pesticide required.")
-                st.write("• Follow good agronomic and preventive practices:")
-                st.write("  - Maintain proper irrigation schedule")
-                st.write("  - Apply balanced fertilizers based on soil test")
-                st.write("  - Ensure good air circulation and spacing")
-                st.write("  - Monitor weekly for early disease or pest signs")
-            else:
-                treatment = TREATMENT_DB.get(pathogen)
-                
-                if treatment:
-                    # ---------------- CHEMICAL CONTROL ----------------
-                    st.markdown("**CHEMICAL CONTROL:**")
-                    for name, dose, purpose in treatment.get("chemical", []):
-                        st.write(f"- **{name}** | Dose: {dose} | Purpose: {purpose}")
-                    
-                    # ---------------- ORGANIC / BIOLOGICAL CONTROL ----------------
-                    st.markdown("\n**ORGANIC / BIOLOGICAL CONTROL:**")
-                    for name, dose, purpose in treatment.get("organic", []):
-                        st.write(f"- **{name}** | Dose: {dose} | Purpose: {purpose}")
-                else:
-                    st.write("• Treatment data not available.")
-                    st.write("• Consult local agricultural extension services.")
-            
-            st.markdown("## 📅 5. RECOVERY TIMELINE")
-            
-            timeline_steps = RECOVERY_TIMELINE.get(severity)
-            
-            if timeline_steps:
-                for step in timeline_steps:
-                    st.write(f"• {step}")
-            else:
-                st.write("• No recovery actions required (plant is healthy).")
-            
-            st.markdown("## 🌾 6. YIELD BOOSTING TECHNIQUES")
-            tips = YIELD_TIPS.get(crop, ["Follow best local practices for this crop"])
-            for i, tip in enumerate(tips, 1):
-                st.write(f"{i}. {tip}")
-            
-            st.markdown("## 🌱 7. LONG-TERM HEALTH MAINTENANCE")
-            st.write("1. Monitor plant health regularly")
-            st.write("2. Maintain optimal growing conditions")
-            st.write("3. Consult with local agricultural experts")
-            
-            st.markdown("## ✅ 8. IMMEDIATE ACTION PLAN")
-            if pathogen == "Healthy":
-                st.write("1. Maintain proper irrigation and nutrition")
-                st.write("2. Monitor weekly for early disease signs")
-                st.write("3. Continue preventive care practices")
-            else:
-                st.write("1. Begin treatment within 24–48 hours")
-                st.write("2. Remove severely infected plant material")
-                st.write("3. Adjust irrigation to minimize leaf wetness")
-                st.write("4. Monitor progress weekly")
-                st.write("5. Isolate affected plants if possible")
-            
-            st.markdown("---")
-            st.markdown("### 📋 REPORT SUMMARY")
-            st.write(f"• Diagnosis: {label} ({confidence*100:.2f}% confidence)")
-            st.write(f"• Status: {'HEALTHY ✅' if pathogen=='Healthy' else 'DISEASED ⚠️'}")
-            st.write(f"• Health Score: {health_score:.1f}%")
-            st.write(f"• Treatment Priority: {severity}")
-            st.write(f"• Expected Recovery: {'Routine care' if pathogen=='Healthy' else 'Follow treatment schedule'}")
-            st.write(f"• Next Review: {'1 month' if pathogen=='Healthy' else '2 weeks'}")
-            
-            st.markdown("💡 **RECOMMENDATIONS:**")
-            st.write("• For severe infections, consult local agricultural extension")
-            st.write("• Always follow pesticide label instructions")
-            st.write("• Consider integrated pest management approaches")
-            st.write("• Keep records of treatments and plant responses")
-            
-            # Add timestamp
-            st.markdown(f"*Report generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*")
-            
-            os.remove(path)
+    if images and st.button("🔍 Diagnose"):
+        # Reports are memoized per session by image content, so re-clicking
+        # Diagnose on the same upload skips inference and report building.
+        # Only reports for the current uploads are kept.
+        keys = [hashlib.blake2b(f.getvalue(), digest_size=16).hexdigest() for f in uploaded_files]
+        old_cache = st.session_state.get("_diag_cache", {})
+        cache = {key: old_cache[key] for key in keys if key in old_cache}
+        st.session_state["_diag_cache"] = cache
+        todo = {key: i for i, key in enumerate(keys) if key not in cache}
+        
+        if todo:
+            with st.spinner("Analyzing plant health..."):
+                # Batched forward pass over all new uploads
+                arrs = [prepare_input(images[i]) for i in todo.values()]
+                for key, (label, confidence) in zip(todo, classify(arrs)):
+                    cache[key] = build_report(label, confidence)
+        
+        for f, key in zip(uploaded_files, keys):
+            if len(uploaded_files) > 1:
+                st.markdown("---")
+                st.subheader(f"🖼️ {f.name}")
+            st.markdown(cache[key])
 else:
-    st.info("👆 Please upload a plant leaf image to begin diagnosis")
+    st.info("👆 Please upload one or more plant leaf images to begin diagnosis")
     st.markdown("### Supported crops:")
     st.write("- Tomato, Potato, Apple, Grape, Corn, Pepper, Peach")
     st.write("- Cherry, Strawberry, Blueberry, Soybean, Raspberry, Squash, Orange")
     st.markdown("### Instructions:")
-    st.write("1. Upload a clear image of the plant leaf")
+    st.write("1. Upload clear images of plant leaves (one or more)")
     st.write("2. Click the 'Diagnose' button")
 
     st.write("3. View detailed diagnosis and recommendations")